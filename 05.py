@@ -24,54 +24,62 @@ def extract_dict(filepath):
                         entries[word] = definition.strip()
     return entries
 
-# 加载两个数据集
-tem_dict = extract_dict(tem_file)
-toefl_oald_dict = extract_dict(toefl_oald_file)
-
 # 合并：优先使用 TOEFL_OALD 定义
-merged_dict = dict(tem_dict)
-for word, definition in toefl_oald_dict.items():
-    merged_dict[word] = definition
+def merge_dicts(tem_dict, toefl_oald_dict):
+    merged_dict = dict(tem_dict)
+    for word, definition in toefl_oald_dict.items():
+        merged_dict[word] = definition
+    return merged_dict
+
+def main():
+    # 加载两个数据集
+    tem_dict = extract_dict(tem_file)
+    toefl_oald_dict = extract_dict(toefl_oald_file)
 
-# 写入合并文件（按字典序）
-with open(merged_file, 'w', encoding='utf-8') as f:
-    for word in sorted(merged_dict.keys()):
-        f.write(f"{word} {merged_dict[word]}\n")
+    merged_dict = merge_dicts(tem_dict, toefl_oald_dict)
 
-# ===== 检查准确性 =====
-tem_words = set(tem_dict.keys())
-toefl_oald_words = set(toefl_oald_dict.keys())
-merged_words = set(merged_dict.keys())
+    # 写入合并文件（按字典序）
+    with open(merged_file, 'w', encoding='utf-8') as f:
+        for word in sorted(merged_dict.keys()):
+            f.write(f"{word} {merged_dict[word]}\n")
 
-missing_words = (tem_words | toefl_oald_words) - merged_words
-extra_words = merged_words - (tem_words | toefl_oald_words)
+    # ===== 检查准确性 =====
+    tem_words = set(tem_dict.keys())
+    toefl_oald_words = set(toefl_oald_dict.keys())
+    merged_words = set(merged_dict.keys())
 
-# 打印信息
-print("✅ 合并完成并检查成功！")
-print(f"📘 TEM 词条数：{len(tem_words)}")
-print(f"📗 TOEFL + OALD8 词条数：{len(toefl_oald_words)}")
-print(f"📚 合并后总词条数：{len(merged_words)}")
-print(f"❗ 缺失词条数：{len(missing_words)}")
-print(f"❗ 多余词条数：{len(extra_words)}")
+    missing_words = (tem_words | toefl_oald_words) - merged_words
+    extra_words = merged_words - (tem_words | toefl_oald_words)
 
-# 示例输出
-if missing_words:
-    print("\n📌 缺失词条示例（前10个）：")
-    for word in list(missing_words)[:10]:
-        print(f" - {word}")
+    # 打印信息
+    print("✅ 合并完成并检查成功！")
+    print(f"📘 TEM 词条数：{len(tem_words)}")
+    print(f"📗 TOEFL + OALD8 词条数：{len(toefl_oald_words)}")
+    print(f"📚 合并后总词条数：{len(merged_words)}")
+    print(f"❗ 缺失词条数：{len(missing_words)}")
+    print(f"❗ 多余词条数：{len(extra_words)}")
 
-# 写入日志
-with open("merge_TEM_TOEFL_OALD8_recheck_log.txt", "w", encoding="utf-8") as fout:
-    fout.write(f"TEM词条数：{len(tem_words)}\n")
-    fout.write(f"TOEFL+OALD词条数：{len(toefl_oald_words)}\n")
-    fout.write(f"合并词条数：{len(merged_words)}\n\n")
+    # 示例输出
     if missing_words:
-        fout.write("缺失词条：\n")
-        for word in sorted(missing_words):
-            fout.write(f"{word}\n")
-    if extra_words:
-        fout.write("\n多余词条：\n")
-        for word in sorted(extra_words):
-            fout.write(f"{word}\n")
+        print("\n📌 缺失词条示例（前10个）：")
+        for word in list(missing_words)[:10]:
+            print(f" - {word}")
+
+    # 写入日志
+    with open("merge_TEM_TOEFL_OALD8_recheck_log.txt", "w", encoding="utf-8") as fout:
+        fout.write(f"TEM词条数：{len(tem_words)}\n")
+        fout.write(f"TOEFL+OALD词条数：{len(toefl_oald_words)}\n")
+        fout.write(f"合并词条数：{len(merged_words)}\n\n")
+        if missing_words:
+            fout.write("缺失词条：\n")
+            for word in sorted(missing_words):
+                fout.write(f"{word}\n")
+        if extra_words:
+            fout.write("\n多余词条：\n")
+            for word in sorted(extra_words):
+                fout.write(f"{word}\n")
+
+    print("📄 检查日志已写入：merge_TEM_TOEFL_OALD8_recheck_log.txt")
 
-print("📄 检查日志已写入：merge_TEM_TOEFL_OALD8_recheck_log.txt")
+if __name__ == "__main__":
+    main()
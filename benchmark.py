@@ -0,0 +1,349 @@
+"""
+阅读器 / 单词提取热点路径的性能基准。
+
+在临时目录里用 PyMuPDF 生成合成 PDF（不同页数、页面尺寸、文字密度、图片页），
+然后测量：
+  - get_pixmap 与 fitz_pix_to_qimage（默认/夜间/护眼）
+  - LazyPDFViewer.check_visible_pages 的滚动开销
+  - 打开大文档到首屏出图的耗时（对照 FIRST_PAINT_TARGET_MS）
+  - WordHighlightPDFPage 的构造与绘制
+  - zhuanhuan.extract_text_before_references / extract_valid_words
+  - 05.py 的词典提取与合并
+另做两项正确性检查：
+  - 词汇分级的词形还原：常见屈折 / 不规则形式应归到词表中的原形
+  - 连续两批高亮增量写回后，文件重新打开不应触发 MuPDF 修复
+
+用法：
+    python benchmark.py                           # 结果写入 bench_results.json
+    python benchmark.py --save-baseline           # 同时保存为基线 bench_baseline.json
+    python benchmark.py --compare bench_baseline.json --threshold 0.2
+
+Qt 部分使用 offscreen 平台，无需显示器。对比基线时若有任何一项中位数变慢超过阈值，
+进程以返回码 1 退出；正确性检查失败或首屏出图超过 FIRST_PAINT_TARGET_MS 时同样返回 1。
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import importlib.util
+import json
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import fitz
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+# 合成文档规格：名称、页数、页面尺寸、每页单词数、是否插入图片
+DOC_SPECS = [
+    ("a4_text", 20, fitz.paper_rect("a4"), 450, False),
+    ("letter_dense", 20, fitz.paper_rect("letter"), 1200, False),
+    ("a3_text", 10, fitz.paper_rect("a3"), 900, False),
+    ("a4_images", 10, fitz.paper_rect("a4"), 120, True),
+    ("a4_book", 400, fitz.paper_rect("a4"), 300, False),
+    ("a4_huge", 5000, fitz.paper_rect("a4"), 40, False),
+]
+RENDER_MODES = ["default", "night", "eye"]
+RENDER_ZOOM = 1.5
+
+def load_word_pool():
+    words = []
+    for filename in ("CET4_6_merged.txt", "GRE_TOEFL_OALD8_merged.txt"):
+        with open(os.path.join(BASE_DIR, filename), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    word = line.strip().split(" ", 1)[0]
+                    if word.isalpha():
+                        words.append(word)
+    return words
+
+def make_pdf(path, page_count, rect, words_per_page, with_images, word_pool, seed=0):
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    doc = fitz.open()
+    for i in range(page_count):
+        page = doc.new_page(width=rect.width, height=rect.height)
+        body = fitz.Rect(36, 36, rect.width - 36, rect.height - 36)
+        if with_images:
+            img_rect = fitz.Rect(body.x0, body.y0, body.x1, body.y0 + body.height * 0.6)
+            w, h = 600, 400
+            samples = np_rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8).tobytes()
+            page.insert_image(img_rect, pixmap=fitz.Pixmap(fitz.csRGB, w, h, samples, 0))
+            body.y0 = img_rect.y1 + 12
+        words = [rng.choice(word_pool) for _ in range(words_per_page)]
+        if i == page_count - 1:
+            words += ["References", "[1]"] + [rng.choice(word_pool) for _ in range(40)]
+        fontsize = 7 if words_per_page > 800 else 10
+        insert_words(page, body, words, fontsize)
+    doc.save(path)
+    doc.close()
+
+def insert_words(page, body, words, fontsize):
+    # 逐行写入，保证所有单词都真正落在页面上（insert_textbox 溢出时会整段丢弃）
+    y = body.y0 + fontsize
+    line = []
+    for word in words + [None]:
+        candidate = " ".join(line + [word]) if word else None
+        if word and fitz.get_text_length(candidate, fontsize=fontsize) < body.width:
+            line.append(word)
+            continue
+        page.insert_text((body.x0, y), " ".join(line), fontsize=fontsize)
+        y += fontsize * 1.3
+        if y > body.y1:
+            break
+        line = [word] if word else []
+
+def measure(func, repeat):
+    func()  # 预热
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        "unit": "ms",
+        "runs": len(samples),
+        "min": round(min(samples), 4),
+        "median": round(statistics.median(samples), 4),
+        "mean": round(statistics.fmean(samples), 4),
+    }
+
+def bench_render(results, docs, repeat):
+    from test import fitz_pix_to_qimage
+    for name, path in docs.items():
+        doc = fitz.open(path)
+        page = doc.load_page(0)
+        mat = fitz.Matrix(RENDER_ZOOM, RENDER_ZOOM)
+        results[f"get_pixmap/{name}"] = measure(lambda: page.get_pixmap(matrix=mat, alpha=False), repeat)
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+        for mode in RENDER_MODES:
+            results[f"fitz_pix_to_qimage/{mode}/{name}"] = measure(lambda: fitz_pix_to_qimage(pix, mode), repeat)
+        doc.close()
+
+def bench_scroll(results, app, path, repeat):
+    from test import LazyPDFViewer
+    viewer = LazyPDFViewer()
+    viewer.resize(1200, 800)
+    viewer.show()
+    app.processEvents()
+    tab = viewer.load_pdf(path)
+    app.processEvents()
+    step = max(1, tab.page_height_hint // 3)
+    positions = [i * step for i in range(60)]
+
+    def scroll_through():
+        for pos in positions:
+            tab.canvas.set_scroll_y(pos)
+            tab.check_visible_pages()
+            viewer.scheduler.drain()
+            app.processEvents()
+
+    stats = measure(scroll_through, max(1, repeat // 5))
+    per_step = {k: (round(v / max(1, len(positions)), 4) if k in ("min", "median", "mean") else v)
+                for k, v in stats.items()}
+    results["check_visible_pages/scroll_step"] = per_step
+    viewer.close()
+    viewer.deleteLater()
+    app.processEvents()
+
+def bench_first_paint(results, app, path, repeat):
+    from test import LazyPDFViewer, FIRST_PAINT_TARGET_MS
+    viewer = LazyPDFViewer()
+    viewer.resize(1200, 800)
+    viewer.show()
+    app.processEvents()
+    samples = []
+    for _ in range(repeat + 1):
+        tab = viewer.load_pdf(path)
+        deadline = time.perf_counter() + 10
+        while tab.first_paint_ms is None and time.perf_counter() < deadline:
+            app.processEvents()
+        samples.append(tab.first_paint_ms if tab.first_paint_ms is not None else float("inf"))
+        viewer.close_tab(viewer.tabs.indexOf(tab))
+        app.processEvents()
+    samples = samples[1:]  # 第一次视为预热
+    name = os.path.splitext(os.path.basename(path))[0]
+    results[f"open/first_paint/{name}"] = {
+        "unit": "ms",
+        "runs": len(samples),
+        "min": round(min(samples), 4),
+        "median": round(statistics.median(samples), 4),
+        "mean": round(statistics.fmean(samples), 4),
+        "target": FIRST_PAINT_TARGET_MS,
+        # 中位数超过目标视为未通过，与正确性检查一样使进程返回 1
+        "ok": statistics.median(samples) <= FIRST_PAINT_TARGET_MS,
+    }
+    viewer.close()
+    viewer.deleteLater()
+    app.processEvents()
+
+def bench_highlight_page(results, app, path, repeat):
+    from PyQt5.QtCore import QPoint
+    from PyQt5.QtGui import QColor, QPainter, QPixmap
+    from test import WordHighlightPDFPage, fitz_pix_to_qimage, VOCAB_TIERS
+    doc = fitz.open(path)
+    page = doc.load_page(0)
+    pix = page.get_pixmap(matrix=fitz.Matrix(RENDER_ZOOM, RENDER_ZOOM), alpha=False)
+    qimg = fitz_pix_to_qimage(pix, "default")
+    colors = [("黄色", (255, 255, 0))]
+    results["WordHighlightPDFPage/construct"] = measure(
+        lambda: WordHighlightPDFPage(page, qimg, 0, colors, None), repeat)
+
+    label = WordHighlightPDFPage(page, qimg, 0, colors, None)
+    for start in range(0, len(label.words), 25):
+        label.highlights.append({'words': label.words[start:start + 5], 'color': QColor(255, 255, 0, 80),
+                                 'note': "note" if start % 50 == 0 else ""})
+    label.set_vocab_words(list(range(0, len(label.words), 3)), VOCAB_TIERS[0][2])
+    target = QPixmap(label.width(), label.height())
+
+    def paint():
+        painter = QPainter(target)
+        label.paint(painter, QPoint(0, 0))
+        painter.end()
+
+    results["WordHighlightPDFPage/paint"] = measure(paint, repeat)
+    doc.close()
+
+# 这些词的原形都在 CET4_6 词表里，应归为熟悉词
+LEMMA_CHECK_WORDS = ["using", "tried", "is", "was", "were", "are", "has", "had", "did", "does",
+                     "made", "taken", "larger", "children", "shown", "stopped", "running", "studies"]
+
+def check_vocab_lemmas(results):
+    from test import classify_page_words, load_vocab_words
+    words = [(0, 0, 1, 1, w) for w in LEMMA_CHECK_WORDS]
+    tiers = classify_page_words(words, load_vocab_words("CET4_6_merged.txt"),
+                                load_vocab_words("GRE_TOEFL_OALD8_merged.txt"))
+    missed = [w[4] for i, w in enumerate(words) if i not in tiers["familiar"]]
+    results["check/vocab_lemmas"] = {"ok": not missed, "missed": missed}
+
+def check_annot_save(results, path, tmp):
+    from PyQt5.QtGui import QColor
+    from test import AnnotationSyncWorker, highlight_to_annot_spec
+    target = os.path.join(tmp, "annot_check.pdf")
+    shutil.copyfile(path, target)
+    with fitz.open(target) as doc:
+        words = [doc.load_page(i).get_text("words")[:3] for i in range(2)]
+    worker = AnnotationSyncWorker(target)
+    errors = []
+    worker.failed.connect(errors.append)
+    # 两批分开写入，对应界面上两次各自触发的保存
+    for idx in range(2):
+        spec = highlight_to_annot_spec({'words': words[idx], 'color': QColor(255, 255, 0, 80), 'note': ""})
+        worker.write_batch({idx: [spec]})
+    worker.stop()
+    with fitz.open(target) as doc:
+        repaired = doc.is_repaired
+        annots = sum(1 for i in range(2) for _ in doc.load_page(i).annots())
+    ok = not errors and not repaired and annots == 2
+    results["check/annot_incremental_save"] = {"ok": ok, "repaired": repaired, "annots": annots, "errors": errors}
+
+def bench_extractor(results, path, repeat):
+    try:
+        import zhuanhuan
+    except Exception as e:  # spaCy / googletrans / 模型缺失时跳过
+        results["extract_text_before_references"] = {"skipped": f"{type(e).__name__}: {e}"}
+        results["extract_valid_words"] = {"skipped": f"{type(e).__name__}: {e}"}
+        return
+    results["extract_text_before_references"] = measure(
+        lambda: zhuanhuan.extract_text_before_references(path), repeat)
+    text = zhuanhuan.extract_text_before_references(path)
+    valid = set(load_word_pool()) | {w.lower() for w in load_word_pool()}
+    results["extract_valid_words"] = measure(lambda: zhuanhuan.extract_valid_words(text, valid), max(1, repeat // 5))
+
+def bench_merge(results, repeat):
+    spec = importlib.util.spec_from_file_location("merge05", os.path.join(BASE_DIR, "05.py"))
+    merge05 = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(merge05)
+    cet = os.path.join(BASE_DIR, "CET4_6_merged.txt")
+    gre = os.path.join(BASE_DIR, "GRE_TOEFL_OALD8_merged.txt")
+    results["05/extract_dict"] = measure(lambda: (merge05.extract_dict(cet), merge05.extract_dict(gre)), repeat)
+    a, b = merge05.extract_dict(cet), merge05.extract_dict(gre)
+    results["05/merge_dicts"] = measure(lambda: merge05.merge_dicts(a, b), repeat)
+
+def run_all(repeat):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {}
+    word_pool = load_word_pool()
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = {}
+        for name, pages, rect, words, images in DOC_SPECS:
+            path = os.path.join(tmp, f"{name}.pdf")
+            make_pdf(path, pages, rect, words, images, word_pool)
+            docs[name] = path
+        render_docs = {k: v for k, v in docs.items() if k not in ("a4_book", "a4_huge")}
+        bench_render(results, render_docs, repeat)
+        bench_scroll(results, app, docs["a4_book"], repeat)
+        bench_first_paint(results, app, docs["a4_huge"], repeat)
+        bench_highlight_page(results, app, docs["letter_dense"], repeat)
+        check_vocab_lemmas(results)
+        check_annot_save(results, docs["a4_text"], tmp)
+        bench_extractor(results, docs["a4_text"], repeat)
+        bench_merge(results, repeat)
+    return results
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'benchmark':55s} {'base':>10s} {'now':>10s} {'ratio':>7s}")
+    for name, now in sorted(results.items()):
+        base = baseline.get("results", {}).get(name)
+        if not base or "median" not in base or "median" not in now:
+            continue
+        ratio = now["median"] / base["median"] if base["median"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- 变慢"
+            regressions.append(name)
+        print(f"{name:55s} {base['median']:10.3f} {now['median']:10.3f} {ratio:7.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF阅读器性能基准")
+    parser.add_argument("--repeat", type=int, default=10, help="每项测量重复次数")
+    parser.add_argument("--output", default="bench_results.json", help="结果 JSON 路径")
+    parser.add_argument("--save-baseline", nargs="?", const="bench_baseline.json", default=None,
+                        help="同时把结果保存为基线")
+    parser.add_argument("--compare", default=None, help="与基线 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="中位数变慢超过该比例视为回归")
+    args = parser.parse_args()
+
+    results = run_all(args.repeat)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入：{args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存：{args.save_baseline}")
+    failed = [name for name, r in results.items() if r.get("ok") is False]
+    for name in failed:
+        print(f"❗ 检查未通过：{name} {results[name]}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❗ {len(regressions)} 项变慢超过 {args.threshold:.0%}")
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
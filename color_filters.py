@@ -0,0 +1,21 @@
+"""夜间 / 护眼配色滤镜，只依赖 numpy，供阅读器与命令行导出共用。"""
+import numpy as np
+
+def invert_rgb(arr):
+    return 255 - arr
+
+def eye_care_rgb(arr):
+    arr = arr.astype(np.float32)
+    arr[..., 0] *= 0.9
+    arr[..., 1] *= 1.13
+    arr[..., 2] *= 0.92
+    arr = np.clip(arr, 0, 255)
+    return arr.astype(np.uint8)
+
+def apply_color_mode(arr, mode="default"):
+    """arr 为 (h, w, 3) 的 uint8 RGB 数组；mode 取 default / night / eye。"""
+    if mode == "night":
+        return invert_rgb(arr)
+    if mode == "eye":
+        return eye_care_rgb(arr)
+    return arr
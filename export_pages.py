@@ -0,0 +1,138 @@
+"""
+命令行批量导出：按指定 DPI 渲染页面，套用夜间 / 护眼滤镜，输出图片或重新打包的 PDF。
+不依赖 Qt，页码区间分块后交给进程池，每个子进程自己打开文档、一次只持有一页图像。
+
+用法：
+    python export_pages.py book.pdf -o out_dir --mode night --dpi 150 --format png
+    python export_pages.py book.pdf -o book_night.pdf --mode night --pages 1-120
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import fitz
+import numpy as np
+
+from color_filters import apply_color_mode
+
+MODES = ["default", "night", "eye"]
+IMAGE_FORMATS = ["png", "jpg"]
+
+def parse_page_ranges(spec, page_count):
+    """"1-5,8,10-" 形式（从 1 开始）转成 0 起始的页码列表；为空表示全部页。"""
+    if not spec:
+        return list(range(page_count))
+    pages = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            start = int(start) if start else 1
+            end = int(end) if end else page_count
+        else:
+            start = end = int(part)
+        if not (1 <= start <= end <= page_count):
+            raise ValueError(f"页码区间超出范围：{part}（共 {page_count} 页）")
+        pages.extend(range(start - 1, end))
+    return sorted(set(pages))
+
+def render_filtered(page, dpi, mode):
+    pix = page.get_pixmap(dpi=dpi, alpha=False)
+    if mode == "default":
+        return pix
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape((pix.height, pix.width, pix.n))
+    img = np.ascontiguousarray(apply_color_mode(img, mode))
+    return fitz.Pixmap(fitz.csRGB, pix.width, pix.height, img.tobytes(), 0)
+
+def export_chunk(pdf_path, pages, dpi, mode, fmt, out_dir):
+    """子进程入口：渲染一段页码。图片模式直接写文件；PDF 模式写一个分段 PDF 并返回其路径。"""
+    doc = fitz.open(pdf_path)
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    part = fitz.open() if fmt == "pdf" else None
+    try:
+        for pno in pages:
+            page = doc.load_page(pno)
+            pix = render_filtered(page, dpi, mode)
+            if part is None:
+                pix.save(os.path.join(out_dir, f"{base_name}_p{pno + 1:04d}.{fmt}"))
+            else:
+                new_page = part.new_page(width=page.rect.width, height=page.rect.height)
+                new_page.insert_image(new_page.rect, pixmap=pix)
+            pix = None
+        if part is None:
+            return None
+        part_path = os.path.join(out_dir, f"part_{pages[0]:06d}.pdf")
+        part.save(part_path, deflate=True)
+        return part_path
+    finally:
+        if part is not None:
+            part.close()
+        doc.close()
+
+def export(pdf_path, output, pages=None, dpi=150, mode="night", fmt=None, workers=None, chunk_size=8):
+    fmt = fmt or ("pdf" if output.lower().endswith(".pdf") else "png")
+    with fitz.open(pdf_path) as doc:
+        page_list = parse_page_ranges(pages, doc.page_count)
+    chunks = [page_list[i:i + chunk_size] for i in range(0, len(page_list), chunk_size)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+
+    if fmt == "pdf":
+        work_dir = tempfile.mkdtemp(prefix="pdf_export_")
+    else:
+        os.makedirs(output, exist_ok=True)
+        work_dir = output
+    t0 = time.perf_counter()
+    part_paths = [None] * len(chunks)
+    done = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(export_chunk, pdf_path, chunk, dpi, mode, fmt, work_dir): i
+                       for i, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                i = futures[future]
+                part_paths[i] = future.result()
+                done += len(chunks[i])
+                print(f"已完成 {done}/{len(page_list)} 页", flush=True)
+        if fmt == "pdf":
+            merged = fitz.open()
+            for part_path in part_paths:
+                with fitz.open(part_path) as part:
+                    merged.insert_pdf(part)
+            merged.save(output, garbage=3, deflate=True)
+            merged.close()
+    finally:
+        if fmt == "pdf":
+            shutil.rmtree(work_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - t0
+    print(f"✅ 导出完成：{len(page_list)} 页，{workers} 个进程，用时 {elapsed:.1f} 秒"
+          f"（{len(page_list) / max(elapsed, 1e-6):.1f} 页/秒）→ {output}")
+    return output
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF 页面批量导出（夜间 / 护眼滤镜）")
+    parser.add_argument("pdf", help="输入 PDF")
+    parser.add_argument("-o", "--output", required=True, help="输出目录（图片）或 .pdf 文件")
+    parser.add_argument("--pages", default=None, help="页码区间，如 1-10,15,20-；默认全部")
+    parser.add_argument("--dpi", type=int, default=150, help="渲染分辨率，默认 150")
+    parser.add_argument("--mode", choices=MODES, default="night", help="配色模式，默认 night")
+    parser.add_argument("--format", choices=IMAGE_FORMATS + ["pdf"], default=None,
+                        help="输出格式；缺省时输出以 .pdf 结尾则为 pdf，否则为 png")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数")
+    parser.add_argument("--chunk-size", type=int, default=8, help="每个任务的页数，默认 8")
+    args = parser.parse_args(argv)
+    try:
+        export(args.pdf, args.output, args.pages, args.dpi, args.mode, args.format,
+               args.workers, max(1, args.chunk_size))
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,89 +1,471 @@
+import json
+import multiprocessing
+import os
+import re
 import sys
+import threading
+import heapq
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from collections import OrderedDict, deque
+from functools import lru_cache
+from itertools import accumulate
 import fitz
 import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QLabel, QVBoxLayout,
-    QScrollArea, QWidget, QComboBox, QLineEdit, QPushButton, QHBoxLayout, QMessageBox,
-    QMenu, QInputDialog, QTreeWidget, QTreeWidgetItem, QSplitter
+    QAbstractScrollArea, QWidget, QComboBox, QLineEdit, QPushButton, QHBoxLayout, QMessageBox,
+    QMenu, QInputDialog, QTreeWidget, QTreeWidgetItem, QSplitter, QTabWidget
 )
-from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QPen
-from PyQt5.QtCore import Qt, QRect, QTimer
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QPen, QFont, QFontMetrics
+from PyQt5.QtCore import Qt, QObject, QPoint, QRect, QSize, QTimer, QThread, pyqtSignal
+from color_filters import apply_color_mode
 
-def invert_rgb(arr):
-    return 255 - arr
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def eye_care_rgb(arr):
-    arr = arr.astype(np.float32)
-    arr[..., 0] *= 0.9
-    arr[..., 1] *= 1.13
-    arr[..., 2] *= 0.92
-    arr = np.clip(arr, 0, 255)
-    return arr.astype(np.uint8)
+# 所有打开文档共享的页面图像内存上限（MB）
+PIXMAP_BUDGET_MB = 512
+COLOR_MODES = {"默认": "default", "夜间": "night", "护眼": "eye"}
+# 打开文档到首屏出图的目标耗时（毫秒），首屏先按 PREVIEW_SCALE 低分辨率渲染再补清晰版
+FIRST_PAINT_TARGET_MS = 300
+PREVIEW_SCALE = 0.3
+REFLOW_FONT_PX = 17
+
+# 词汇分级：显示名、内部键、着色
+VOCAB_TIERS = [
+    ("熟悉词", "familiar", (80, 200, 120)),
+    ("待学词", "unfamiliar", (255, 120, 40)),
+    ("生词", "unknown", (190, 90, 255)),
+]
+# 屈折后缀：(后缀, 替换, 词干最少字母数)；补 e / y 的规则允许两字母词干（use、try）
+VOCAB_SUFFIXES = [
+    ("ies", "y", 2), ("ied", "y", 2), ("ier", "y", 2), ("iest", "y", 2),
+    ("es", "", 3), ("s", "", 3),
+    ("ed", "", 3), ("ed", "e", 2), ("ing", "", 3), ("ing", "e", 2),
+    ("er", "", 3), ("er", "e", 2), ("est", "", 3), ("est", "e", 2),
+]
+# 不规则变化（be/have/do、常见不规则动词与复数、比较级）
+IRREGULAR_FORMS = {
+    "am": "be", "is": "be", "are": "be", "was": "be", "were": "be", "been": "be", "being": "be",
+    "has": "have", "had": "have", "having": "have",
+    "does": "do", "did": "do", "done": "do", "doing": "do", "goes": "go",
+    "went": "go", "gone": "go", "made": "make", "took": "take", "taken": "take",
+    "shown": "show", "gave": "give", "given": "give", "saw": "see", "seen": "see",
+    "knew": "know", "known": "know", "found": "find", "got": "get", "gotten": "get",
+    "came": "come", "became": "become", "began": "begin", "begun": "begin",
+    "brought": "bring", "bought": "buy", "thought": "think", "told": "tell", "said": "say",
+    "wrote": "write", "written": "write", "chose": "choose", "chosen": "choose",
+    "held": "hold", "kept": "keep", "left": "leave", "led": "lead", "meant": "mean",
+    "met": "meet", "paid": "pay", "ran": "run", "sent": "send", "spent": "spend",
+    "stood": "stand", "understood": "understand", "won": "win", "built": "build",
+    "drew": "draw", "drawn": "draw", "fell": "fall", "fallen": "fall", "felt": "feel",
+    "grew": "grow", "grown": "grow", "lost": "lose", "rose": "rise", "risen": "rise",
+    "sold": "sell", "taught": "teach", "threw": "throw", "thrown": "throw",
+    "wore": "wear", "worn": "wear", "broke": "break", "broken": "break",
+    "spoke": "speak", "spoken": "speak", "ate": "eat", "eaten": "eat",
+    "children": "child", "men": "man", "women": "woman", "people": "person",
+    "feet": "foot", "teeth": "tooth", "mice": "mouse", "phenomena": "phenomenon",
+    "criteria": "criterion", "analyses": "analysis", "indices": "index", "matrices": "matrix",
+    "better": "good", "best": "good", "worse": "bad", "worst": "bad",
+}
+WORD_EDGE_RE = re.compile(r"^[^A-Za-z]+|[^A-Za-z]+$")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --------- 性能记录 -----------
+class PerfSpan:
+    def __init__(self, recorder, name, cat, args):
+        self.recorder = recorder
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.add(self.name, self.cat, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+class PerfRecorder:
+    """关闭时 span() 直接返回共享的空上下文，只多一次属性判断。"""
+    NULL_SPAN = nullcontext()
+
+    def __init__(self, max_events=50000):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self.counters = {}
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def span(self, name, cat="viewer", **args):
+        if not self.enabled:
+            return self.NULL_SPAN
+        return PerfSpan(self, name, cat, args)
+
+    def add(self, name, cat, start, dur, args=None):
+        with self.lock:
+            self.events.append(("X", name, cat, start, dur, threading.get_ident(), args or {}))
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def sample(self, name, values):
+        if self.enabled:
+            with self.lock:
+                self.events.append(("C", name, "stats", time.perf_counter(), 0, 0, values))
+
+    def clear(self):
+        with self.lock:
+            self.events.clear()
+            self.counters.clear()
+
+    def summary(self, window=5.0):
+        """最近 window 秒内各阶段的次数 / 平均 / 最大耗时（毫秒）。"""
+        since = time.perf_counter() - window
+        stats = {}
+        with self.lock:
+            events = list(self.events)
+        for ph, name, cat, start, dur, tid, args in reversed(events):
+            if start < since:
+                break
+            if ph != "X":
+                continue
+            n, total, worst = stats.get(name, (0, 0.0, 0.0))
+            stats[name] = (n + 1, total + dur, max(worst, dur))
+        return {name: (n, total / n * 1000, worst * 1000) for name, (n, total, worst) in stats.items()}
+
+    def export_chrome_trace(self, path):
+        pid = os.getpid()
+        trace = []
+        with self.lock:
+            events = list(self.events)
+        for ph, name, cat, start, dur, tid, args in events:
+            ev = {"name": name, "cat": cat, "ph": ph, "pid": pid, "tid": tid,
+                  "ts": round((start - self.origin) * 1e6, 1), "args": args}
+            if ph == "X":
+                ev["dur"] = round(dur * 1e6, 1)
+            trace.append(ev)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms",
+                       "otherData": {"counters": dict(self.counters)}}, f, ensure_ascii=False)
+
+perf = PerfRecorder()
+
+def process_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+def reflow_palette(mode):
+    """重排模式的背景色与文字色，经同一套滤镜得到，与页面光栅的夜间/护眼效果一致。"""
+    base = np.array([[[255, 255, 255], [20, 20, 20]]], dtype=np.uint8)
+    bg, fg = apply_color_mode(base, mode)[0]
+    return QColor(*map(int, bg)), QColor(*map(int, fg))
 
 def fitz_pix_to_qimage(pix, mode="default"):
     img = np.frombuffer(pix.samples, dtype=np.uint8).reshape((pix.height, pix.width, pix.n))
     if pix.n == 4:
         img = img[..., :3]
-    if mode == "night":
-        img = invert_rgb(img)
-    elif mode == "eye":
-        img = eye_care_rgb(img)
+    img = apply_color_mode(img, mode)
     qimg = QImage(img.data, pix.width, pix.height, pix.width*3, QImage.Format_RGB888)
     return qimg.copy()
 
-class WordHighlightPDFPage(QLabel):
-    def __init__(self, page, qimg, page_idx, highlight_colors, main_win, highlight_data=None, parent=None):
+# --------- 词汇分级（与 zhuanhuan.py 相同的词表） -----------
+@lru_cache(maxsize=None)
+def load_vocab_words(filename):
+    path = os.path.join(BASE_DIR, filename)
+    if not os.path.exists(path):
+        return frozenset()
+    words = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                words.add(line.strip().split(" ", 1)[0].lower())
+    return frozenset(words)
+
+def word_candidates(word):
+    """简单词形还原：原词、不规则变化原形，再是去掉常见屈折后缀的候选。"""
+    yield word
+    if word in IRREGULAR_FORMS:
+        yield IRREGULAR_FORMS[word]
+    for suffix, repl, min_stem in VOCAB_SUFFIXES:
+        stem = word[:-len(suffix)]
+        if not word.endswith(suffix) or len(stem) < min_stem:
+            continue
+        yield stem + repl
+        # stopped / running / bigger：去掉双写的末辅音
+        if not repl and len(stem) >= 4 and stem[-1] == stem[-2]:
+            yield stem[:-1]
+
+def classify_page_words(words, familiar_vocab, learn_vocab, valid_vocab=None):
+    """按 zhuanhuan.py 的规则把一页的单词分为 熟悉/待学/生词，返回 {层级: [单词下标]}。
+    没有 words_alpha.txt（valid_vocab 为空）时无法确认生词是真实单词，改为跳过
+    含大写字母的词（人名、缩写如 LSTM、GPUs）和不足 3 个字母的词（et al）。"""
+    tiers = {key: [] for _, key, _ in VOCAB_TIERS}
+    seen = {}  # 同一页里重复的词只查一次
+    for i, w in enumerate(words):
+        raw = WORD_EDGE_RE.sub("", w[4])
+        if raw not in seen:
+            seen[raw] = word_tier(raw, familiar_vocab, learn_vocab, valid_vocab)
+        if seen[raw]:
+            tiers[seen[raw]].append(i)
+    return tiers
+
+def word_tier(raw, familiar_vocab, learn_vocab, valid_vocab):
+    token = raw.lower()
+    if len(token) < 2 or not token.isalpha():
+        return None
+    candidates = []
+    # 按候选顺序取第一个能查到的形式，原词优先于猜出来的词干；多数词第一个候选就能查到
+    for c in word_candidates(token):
+        if c in familiar_vocab:
+            return "familiar"
+        if c in learn_vocab:
+            return "unfamiliar"
+        candidates.append(c)
+    if valid_vocab:
+        return "unknown" if any(c in valid_vocab for c in candidates) else None
+    return "unknown" if raw.islower() and len(token) >= 3 else None
+
+# --------- 高亮与 PDF 注释互转 -----------
+# 本程序写入的高亮注释以此为作者；其他工具的高亮原样保留在页面里，不读取也不改写
+ANNOT_TITLE = "PDF-reader"
+
+def is_own_highlight(annot):
+    return annot.type[0] == fitz.PDF_ANNOT_HIGHLIGHT and annot.info.get("title") == ANNOT_TITLE
+
+def highlight_to_annot_spec(h):
+    """界面线程中把一条高亮转成与 Qt 无关的快照，交给后台写入。"""
+    color = h['color']
+    return {
+        'rects': [tuple(w[:4]) for w in h['words']],
+        'color': (color.redF(), color.greenF(), color.blueF()),
+        'opacity': color.alphaF(),
+        'note': h.get('note', ""),
+    }
+
+def take_highlight_annots(page):
+    """读出本程序写入的高亮注释并从内存中的页面删除，避免渲染时与高亮层重复绘制。"""
+    specs = []
+    annot = page.first_annot
+    while annot:
+        if not is_own_highlight(annot):
+            annot = annot.next
+            continue
+        vertices = annot.vertices or []
+        rects = [fitz.Quad(vertices[i:i + 4]).rect for i in range(0, len(vertices) - 3, 4)] or [annot.rect]
+        stroke = annot.colors.get("stroke") or (1, 1, 0)
+        specs.append({
+            'rects': rects,
+            'color': tuple(stroke[:3]) if len(stroke) >= 3 else (stroke[0],) * 3,
+            'opacity': annot.opacity if 0 < annot.opacity < 1 else 80 / 255,
+            'note': annot.info.get("content", ""),
+        })
+        annot = page.delete_annot(annot)
+    return specs
+
+def annot_spec_to_highlight(spec, words):
+    rects = [fitz.Rect(r) for r in spec['rects']]
+    hl_words = []
+    for w in words:
+        center = fitz.Point((w[0] + w[2]) / 2, (w[1] + w[3]) / 2)
+        if any(center in r for r in rects):
+            hl_words.append(w)
+    if not hl_words:
+        return None
+    r, g, b = spec['color']
+    return {
+        'words': hl_words,
+        'color': QColor(int(r * 255), int(g * 255), int(b * 255), int(spec['opacity'] * 255)),
+        'note': spec['note'],
+    }
+
+def write_annot_batch(pdf_path, batch):
+    """在子进程中执行：重写各页上本程序写入的高亮注释并增量保存；出错时返回提示文字。"""
+    # 每批重新打开文件：同一文档对象连续增量保存会写出错误的 /Prev 交叉引用
+    doc = fitz.open(pdf_path)
+    try:
+        for idx, specs in batch.items():
+            page = doc.load_page(idx)
+            annot = page.first_annot
+            while annot:
+                if is_own_highlight(annot):
+                    annot = page.delete_annot(annot)
+                else:
+                    annot = annot.next
+            for spec in specs:
+                annot = page.add_highlight_annot(quads=[fitz.Rect(r).quad for r in spec['rects']])
+                annot.set_colors(stroke=spec['color'])
+                annot.set_opacity(spec['opacity'])
+                annot.set_info(content=spec['note'], title=ANNOT_TITLE)
+                annot.update()
+        if not doc.can_save_incrementally():
+            return "该文件不支持增量保存，高亮未写入"
+        doc.save(pdf_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+        return None
+    finally:
+        doc.close()
+
+class AnnotationSyncWorker(QThread):
+    """后台把高亮写回 PDF：同一页的多次修改只保留最新快照，只重写变动页上本程序写入的高亮注释，并增量保存。
+    PyMuPDF 不支持多线程且调用期间不释放 GIL，实际读写放在单独的子进程里，本线程只负责合并与等待。"""
+    saved = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, pdf_path, parent=None):
         super().__init__(parent)
+        self.pdf_path = pdf_path
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        self.pool = None
+
+    def submit(self, page_specs):
+        with self.lock:
+            self.pending.update(page_specs)
+        self.wake.set()
+
+    def stop(self):
+        """写完尚未保存的修改后退出。"""
+        with self.lock:
+            self.stopped = True
+        self.wake.set()
+        self.wait()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def run(self):
+        while True:
+            self.wake.wait()
+            with self.lock:
+                batch, self.pending = self.pending, {}
+                # 停止后保持唤醒，直到写入期间新提交的修改也已取走
+                if self.stopped and not batch:
+                    break
+                if not self.stopped:
+                    self.wake.clear()
+            # submit 在锁外置位 wake，可能取走修改后又被空唤醒一次
+            if batch:
+                self.write_batch(batch)
+
+    def write_batch(self, batch):
+        try:
+            if self.pool is None:
+                # 界面进程里有 Qt 线程，用 spawn 而不是 fork 启动子进程
+                self.pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            with perf.span("annot_save", "annot", pages=len(batch)):
+                error = self.pool.submit(write_annot_batch, self.pdf_path, batch).result()
+            if error:
+                self.failed.emit(error)
+                return
+            self.saved.emit(len(batch))
+        except Exception as e:
+            self.failed.emit(f"高亮写入失败：{e}")
+
+class WordHighlightPDFPage:
+    """单页的图像、单词与高亮数据；由 PDFPageCanvas 在计算出的位置上绘制，本身不是控件。"""
+    def __init__(self, page, qimg, page_idx, highlight_colors, doc_view, highlight_data=None):
         self.page = page
-        self.base_qimg = qimg
+        self.pixmap = QPixmap.fromImage(qimg) if qimg is not None else None
         self.page_idx = page_idx
-        self.setPixmap(QPixmap.fromImage(self.base_qimg))
-        self.setAlignment(Qt.AlignCenter)
         self.selection_rect = None
         self.selecting = False
         self.start_pos = None
         self.end_pos = None
-        self.setMouseTracking(True)
-        self.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.customContextMenuRequested.connect(self.context_menu)
         self.highlight_colors = highlight_colors
-        self.words = page.get_text("words")
+        with perf.span("text", page=page_idx):
+            self.words = page.get_text("words")
         self.highlights = highlight_data if highlight_data is not None else []
-        self.main_win = main_win
+        self.vocab_highlights = []
+        self.doc_view = doc_view
+        self.layout_words()
 
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            self.selecting = True
-            self.start_pos = event.pos()
-            self.end_pos = event.pos()
-            self.selection_rect = QRect(self.start_pos, self.end_pos)
-            self.update()
-        super().mousePressEvent(event)
+    def layout_words(self):
+        page_rect = self.page.rect
+        self.scale_x = self.width() / page_rect.width
+        self.scale_y = self.height() / page_rect.height
 
-    def mouseMoveEvent(self, event):
+    def word_rect(self, w):
+        """单词在页内显示坐标中的矩形。"""
+        x0, y0, x1, y1 = w[:4]
+        rx0 = int(x0 * self.scale_x)
+        ry0 = int(y0 * self.scale_y)
+        rx1 = int(x1 * self.scale_x)
+        ry1 = int(y1 * self.scale_y)
+        return QRect(rx0, ry0, rx1 - rx0, ry1 - ry0)
+
+    def width(self):
+        return self.pixmap.width()
+
+    def height(self):
+        return self.pixmap.height()
+
+    def image_bytes(self):
+        return self.pixmap.width() * self.pixmap.height() * self.pixmap.depth() // 8
+
+    def set_image(self, qimg):
+        """换成同尺寸的新图像（低清预览补成清晰版），单词与高亮不变。"""
+        self.pixmap = QPixmap.fromImage(qimg)
+
+    def update(self):
+        if self.doc_view is not None:
+            self.doc_view.canvas.update_page(self.page_idx)
+
+    def highlights_changed(self):
+        if self.doc_view is not None:
+            self.doc_view.mark_highlights_dirty(self.page_idx)
+
+    def set_vocab_words(self, word_indices, color):
+        if word_indices:
+            self.vocab_highlights = [{
+                'words': [self.words[i] for i in word_indices if i < len(self.words)],
+                'color': QColor(*color, 70),
+                'note': "",
+            }]
+        else:
+            self.vocab_highlights = []
+        self.update()
+
+    # 以下 pos 均为页内坐标
+    def mouse_press(self, pos):
+        self.selecting = True
+        self.start_pos = pos
+        self.end_pos = pos
+        self.selection_rect = QRect(self.start_pos, self.end_pos)
+        self.update()
+
+    def mouse_move(self, pos):
+        """拖选时更新选区；否则返回悬停处的批注提示。"""
         if self.selecting:
-            self.end_pos = event.pos()
+            self.end_pos = pos
             self.selection_rect = QRect(self.start_pos, self.end_pos).normalized()
             self.update()
-        else:
-            tip = ""
-            for h in self.highlights:
-                if h.get('note'):
-                    if self.is_pos_in_words(event.pos(), h['words']):
-                        tip = f"批注：{h['note']}"
-                        break
-            self.setToolTip(tip)
-        super().mouseMoveEvent(event)
+            return ""
+        for h in self.highlights:
+            if h.get('note'):
+                if self.is_pos_in_words(pos, h['words']):
+                    return f"批注：{h['note']}"
+        return ""
 
-    def mouseReleaseEvent(self, event):
-        if event.button() == Qt.LeftButton and self.selecting:
-            self.end_pos = event.pos()
+    def mouse_release(self, pos):
+        if self.selecting:
+            self.end_pos = pos
             self.selection_rect = QRect(self.start_pos, self.end_pos).normalized()
             self.add_default_highlight()
             self.selecting = False
             self.selection_rect = None
             self.update()
-        super().mouseReleaseEvent(event)
 
     def add_default_highlight(self):
         sel_words = self.get_selected_words()
@@ -94,26 +476,18 @@ class WordHighlightPDFPage(QLabel):
                 'color': QColor(*color, 80),
                 'note': "",
             })
+            self.highlights_changed()
 
     def is_pos_in_words(self, pos, words):
-        qimg_w, qimg_h = self.base_qimg.width(), self.base_qimg.height()
-        page_rect = self.page.rect
-        scale_x = qimg_w / page_rect.width
-        scale_y = qimg_h / page_rect.height
         for w in words:
-            x0, y0, x1, y1 = w[:4]
-            rx0 = int(x0 * scale_x)
-            ry0 = int(y0 * scale_y)
-            rx1 = int(x1 * scale_x)
-            ry1 = int(y1 * scale_y)
-            if QRect(rx0, ry0, rx1 - rx0, ry1 - ry0).contains(pos):
+            if self.word_rect(w).contains(pos):
                 return True
         return False
 
-    def context_menu(self, pos):
+    def context_menu(self, widget, pos, global_pos):
         for idx, h in enumerate(self.highlights):
             if self.is_pos_in_words(pos, h['words']):
-                menu = QMenu(self)
+                menu = QMenu(widget)
                 color_actions = []
                 for name, color in self.highlight_colors:
                     act = menu.addAction(f"更改为：{name}")
@@ -121,17 +495,23 @@ class WordHighlightPDFPage(QLabel):
                 act_note = menu.addAction("编辑批注")
                 act_del = menu.addAction("删除高亮")
                 act_cancel = menu.addAction("取消")
-                action = menu.exec_(self.mapToGlobal(pos))
+                action = menu.exec_(global_pos)
+                changed = False
                 if action == act_del:
                     self.highlights.pop(idx)
+                    changed = True
                 elif action == act_note:
-                    note, ok = QInputDialog.getText(self, "编辑批注", "输入批注内容：", text=h.get("note", ""))
+                    note, ok = QInputDialog.getText(widget, "编辑批注", "输入批注内容：", text=h.get("note", ""))
                     if ok:
                         self.highlights[idx]['note'] = note
+                        changed = True
                 elif action in [a for a, c in color_actions]:
                     sel_idx = [a for a, c in color_actions].index(action)
                     color = color_actions[sel_idx][1]
                     self.highlights[idx]['color'] = QColor(*color, 80)
+                    changed = True
+                if changed:
+                    self.highlights_changed()
                 self.update()
                 return
         return
@@ -139,78 +519,781 @@ class WordHighlightPDFPage(QLabel):
     def get_selected_words(self):
         if not self.selection_rect or self.selection_rect.width() < 5 or self.selection_rect.height() < 5:
             return []
-        qimg_w, qimg_h = self.base_qimg.width(), self.base_qimg.height()
-        page_rect = self.page.rect
-        scale_x = page_rect.width / qimg_w
-        scale_y = page_rect.height / qimg_h
-        x1 = self.selection_rect.left() * scale_x
-        y1 = self.selection_rect.top() * scale_y
-        x2 = self.selection_rect.right() * scale_x
-        y2 = self.selection_rect.bottom() * scale_y
-        select_box = fitz.Rect(x1, y1, x2, y2)
-        sel_words = [w for w in self.words if fitz.Rect(w[:4]).intersects(select_box)]
+        sel_words = [w for w in self.words if self.word_rect(w).intersects(self.selection_rect)]
         return sel_words
 
     def get_selected_text(self):
         sel_words = self.get_selected_words()
         return " ".join(w[4] for w in sel_words)
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.drawPixmap(0, 0, QPixmap.fromImage(self.base_qimg))
+    def paint(self, painter, origin):
+        with perf.span("paint", page=self.page_idx):
+            painter.save()
+            painter.translate(origin)
+            self.paint_page(painter)
+            painter.restore()
+
+    def paint_content(self, painter):
+        painter.drawPixmap(0, 0, self.pixmap)
+
+    def paint_page(self, painter):
+        self.paint_content(painter)
         painter.setRenderHint(QPainter.Antialiasing)
-        qimg_w, qimg_h = self.base_qimg.width(), self.base_qimg.height()
-        page_rect = self.page.rect
-        scale_x = qimg_w / page_rect.width
-        scale_y = qimg_h / page_rect.height
-        for h in self.highlights:
+        for h in self.vocab_highlights + self.highlights:
             color = h['color']
             draw_underline = bool(h.get("note")) and h.get("note").strip()
             for w in h['words']:
-                x0, y0, x1, y1 = w[:4]
-                rx0 = int(x0 * scale_x)
-                ry0 = int(y0 * scale_y)
-                rx1 = int(x1 * scale_x)
-                ry1 = int(y1 * scale_y)
-                rect = QRect(rx0, ry0, rx1 - rx0, ry1 - ry0)
+                rect = self.word_rect(w)
                 painter.fillRect(rect, color)
                 # 下划线
                 if draw_underline:
                     painter.setPen(QPen(Qt.red, max(2, rect.height()//15)))
-                    underline_y = ry1 - 2
-                    painter.drawLine(rx0 + 1, underline_y, rx1 - 1, underline_y)
+                    underline_y = rect.bottom() - 1
+                    painter.drawLine(rect.left() + 1, underline_y, rect.right(), underline_y)
         if self.selection_rect:
             painter.setPen(QPen(Qt.red, 2, Qt.DashLine))
             painter.drawRect(self.selection_rect)
+
+class ReflowTextPage(WordHighlightPDFPage):
+    """重排阅读：按 PyMuPDF 的块/行顺序把单词排成适应视口宽度的文字，不做光栅化。
+    单词列表与 WordHighlightPDFPage 相同，高亮与词汇标注沿用同一套单词下标。"""
+    MARGIN = 24
+
+    def __init__(self, page, page_idx, highlight_colors, doc_view, highlight_data=None,
+                 view_width=800, font_px=16, mode="default"):
+        self.view_width = max(200, view_width)
+        self.font = QFont()
+        self.font.setPixelSize(max(8, int(font_px)))
+        self.background, self.text_color = reflow_palette(mode)
+        super().__init__(page, None, page_idx, highlight_colors, doc_view, highlight_data)
+
+    def layout_words(self):
+        with perf.span("reflow", page=self.page_idx):
+            fm = QFontMetrics(self.font)
+            self.ascent = fm.ascent()
+            line_h = int(fm.height() * 1.35)
+            space_w = fm.horizontalAdvance(" ")
+            left, right = self.MARGIN, self.view_width - self.MARGIN
+            x, y = left, self.MARGIN
+            prev_block = None
+            self.word_rects = []
+            for w in self.words:
+                ww = fm.horizontalAdvance(w[4])
+                if prev_block is not None and w[5] != prev_block:
+                    # 新文本块另起一段
+                    x, y = left, y + int(line_h * 1.6)
+                elif x > left and x + ww > right:
+                    x, y = left, y + line_h
+                self.word_rects.append(QRect(x, y, ww, fm.height()))
+                x += ww + space_w
+                prev_block = w[5]
+            self.word_index = {tuple(w): i for i, w in enumerate(self.words)}
+            self.content_height = y + line_h + self.MARGIN
+
+    def word_rect(self, w):
+        i = self.word_index.get(tuple(w))
+        return self.word_rects[i] if i is not None else QRect()
+
+    def width(self):
+        return self.view_width
+
+    def height(self):
+        return self.content_height
+
+    def image_bytes(self):
+        # 没有位图，只按单词与排版数据粗略估算
+        return len(self.words) * 256
+
+    def paint_content(self, painter):
+        clip = painter.clipBoundingRect().toAlignedRect()
+        painter.fillRect(QRect(0, 0, self.width(), self.height()), self.background)
+        painter.setFont(self.font)
+        painter.setPen(self.text_color)
+        for w, rect in zip(self.words, self.word_rects):
+            if clip.isEmpty() or rect.intersects(clip):
+                painter.drawText(rect.x(), rect.y() + self.ascent, w[4])
+
+class PDFPageCanvas(QAbstractScrollArea):
+    """整本文档只用这一个控件：按页高前缀和计算每页位置，只绘制与重绘区相交的页。
+    控件只有视口大小，文档坐标由滚动条换算，不受 Qt 控件 16777215 像素的尺寸上限限制。"""
+    PAGE_SPACING = 16
+    # 文档过长超出滚动条 int 范围时，滚动条一格对应多个像素
+    SCROLL_LIMIT = 1 << 30
+
+    def __init__(self, doc_view, parent=None):
+        super().__init__(parent)
+        self.doc_view = doc_view
+        self.page_heights = []
+        self.page_offsets = [0]
+        self.offsets_dirty = False
+        self.page_width_hint = 0
+        self.scroll_scale = 1
+        self.press_page = None
+        self.viewport().setMouseTracking(True)
+        self.viewport().setAttribute(Qt.WA_OpaquePaintEvent)
+        # 常驻竖向滚动条，避免其出现/消失改变视口宽度导致整体缩放变化
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+
+    # ---- 布局 ----
+    def set_layout(self, page_heights, width_hint):
+        self.page_heights = list(page_heights)
+        self.page_width_hint = width_hint
+        self.offsets_dirty = True
+        self.update_canvas_size()
+
+    def set_page_heights(self, heights):
+        """批量修正页高 {页码: 高度}，保持视口顶部所在页的位置不跳动。"""
+        heights = {i: h for i, h in heights.items() if self.page_heights[i] != h}
+        if not heights:
+            return
+        anchor = self.page_at(self.scroll_y())
+        delta = self.scroll_y() - self.page_top(anchor)
+        for i, h in heights.items():
+            self.page_heights[i] = h
+        self.offsets_dirty = True
+        self.update_canvas_size()
+        self.set_scroll_y(self.page_top(anchor) + delta)
+
+    def set_page_height(self, idx, height):
+        # 视口上方的页（如重排页）加载后变高，也要保持当前页不被推走
+        self.set_page_heights({idx: height})
+
+    def offsets(self):
+        if self.offsets_dirty:
+            self.page_offsets = [0] + list(accumulate(h + self.PAGE_SPACING for h in self.page_heights))
+            self.offsets_dirty = False
+        return self.page_offsets
+
+    def content_width(self):
+        return max(self.viewport().width(), self.page_width_hint)
+
+    def update_canvas_size(self):
+        """按文档总高更新滚动条范围（控件本身不随文档变大）。"""
+        y = self.scroll_y()
+        total = self.offsets()[-1]
+        view_w, view_h = self.viewport().width(), self.viewport().height()
+        self.scroll_scale = total // self.SCROLL_LIMIT + 1
+        vbar = self.verticalScrollBar()
+        vbar.setRange(0, max(0, total - view_h) // self.scroll_scale)
+        vbar.setPageStep(max(1, view_h // self.scroll_scale))
+        vbar.setSingleStep(max(1, 40 // self.scroll_scale))
+        hbar = self.horizontalScrollBar()
+        hbar.setRange(0, max(0, self.page_width_hint - view_w))
+        hbar.setPageStep(max(1, view_w))
+        hbar.setSingleStep(40)
+        self.set_scroll_y(y)
+        self.viewport().update()
+
+    def scroll_y(self):
+        return self.verticalScrollBar().value() * self.scroll_scale
+
+    def set_scroll_y(self, y):
+        # 向上取整，缩放后 scroll_y() 也不会落到目标位置之上
+        self.verticalScrollBar().setValue(-(-int(y) // self.scroll_scale))
+
+    def scroll_x(self):
+        return self.horizontalScrollBar().value()
+
+    def set_scroll_x(self, x):
+        self.horizontalScrollBar().setValue(int(x))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_canvas_size()
+
+    def page_count(self):
+        return len(self.page_heights)
+
+    def page_top(self, idx):
+        return self.offsets()[idx]
+
+    def page_at(self, y):
+        if not self.page_heights:
+            return -1
+        return max(0, min(bisect_right(self.offsets(), y) - 1, len(self.page_heights) - 1))
+
+    def page_origin(self, idx):
+        """页左上角的文档坐标。"""
+        label = self.doc_view.loaded_pages.get(idx)
+        w = label.width() if label else self.page_width_hint
+        return QPoint(max(0, (self.content_width() - w) // 2), self.page_top(idx))
+
+    def page_rect(self, idx):
+        label = self.doc_view.loaded_pages.get(idx)
+        w = label.width() if label else self.page_width_hint
+        return QRect(self.page_origin(idx), QSize(w, self.page_heights[idx]))
+
+    def view_origin(self, idx):
+        """页左上角的视口坐标。"""
+        return self.page_origin(idx) - QPoint(self.scroll_x(), self.scroll_y())
+
+    def view_rect(self, idx):
+        return self.page_rect(idx).translated(-self.scroll_x(), -self.scroll_y())
+
+    def update_page(self, idx):
+        if 0 <= idx < len(self.page_heights):
+            rect = self.view_rect(idx).intersected(self.viewport().rect())
+            if not rect.isEmpty():
+                self.viewport().update(rect)
+
+    def hit_test(self, pos):
+        """pos 为视口坐标；返回 (已加载的页对象, 页内坐标)，未命中返回 (None, None)。"""
+        idx = self.page_at(pos.y() + self.scroll_y())
+        label = self.doc_view.loaded_pages.get(idx)
+        if label is None:
+            return None, None
+        return label, pos - self.view_origin(idx)
+
+    # ---- 绘制 ----
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        rect = event.rect()
+        painter.setClipRect(rect)
+        painter.fillRect(rect, self.palette().window())
+        painted = False
+        if self.page_heights:
+            first = self.page_at(rect.top() + self.scroll_y())
+            last = self.page_at(rect.bottom() + self.scroll_y())
+            for idx in range(first, last + 1):
+                label = self.doc_view.loaded_pages.get(idx)
+                if label is not None:
+                    label.paint(painter, self.view_origin(idx))
+                    painted = True
+                else:
+                    page_rect = self.view_rect(idx)
+                    painter.fillRect(page_rect, QColor(235, 235, 235))
+                    painter.setPen(QColor(160, 160, 160))
+                    painter.drawText(page_rect, Qt.AlignCenter, f"{idx + 1}")
         painter.end()
+        if painted and self.doc_view.first_paint_ms is None:
+            self.doc_view.on_first_paint()
+
+    # ---- 鼠标事件转发给所在页 ----
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            label, local = self.hit_test(event.pos())
+            self.press_page = label
+            if label is not None:
+                label.mouse_press(local)
+
+    def mouseMoveEvent(self, event):
+        if self.press_page is not None:
+            self.press_page.mouse_move(event.pos() - self.view_origin(self.press_page.page_idx))
+        else:
+            label, local = self.hit_test(event.pos())
+            self.viewport().setToolTip(label.mouse_move(local) if label is not None else "")
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton and self.press_page is not None:
+            label, self.press_page = self.press_page, None
+            label.mouse_release(event.pos() - self.view_origin(label.page_idx))
+
+    def contextMenuEvent(self, event):
+        label, local = self.hit_test(event.pos())
+        if label is not None:
+            label.context_menu(self, local, event.globalPos())
 
     def wheelEvent(self, event):
         if event.modifiers() & Qt.ControlModifier:
-            main_win = self.main_win
-            if hasattr(main_win, "user_zoom"):
-                mouse_pos = event.pos()
-                old_zoom = main_win.user_zoom
-                if event.angleDelta().y() > 0 and main_win.user_zoom < 5.0:
-                    main_win.user_zoom *= 1.15
-                elif event.angleDelta().y() < 0 and main_win.user_zoom > 0.25:
-                    main_win.user_zoom /= 1.15
-                main_win.user_zoom = max(0.25, min(5.0, main_win.user_zoom))
-                main_win.update_pages_and_keep_mouse_focus(self.page_idx, mouse_pos, old_zoom)
-                event.accept()
-                return
+            doc_view = self.doc_view
+            label, local = self.hit_test(event.pos())
+            if label is not None:
+                old_zoom = doc_view.user_zoom
+                if event.angleDelta().y() > 0 and doc_view.user_zoom < 5.0:
+                    doc_view.user_zoom *= 1.15
+                elif event.angleDelta().y() < 0 and doc_view.user_zoom > 0.25:
+                    doc_view.user_zoom /= 1.15
+                doc_view.user_zoom = max(0.25, min(5.0, doc_view.user_zoom))
+                doc_view.update_pages_and_keep_mouse_focus(label.page_idx, local, old_zoom)
+            event.accept()
+            return
         super().wheelEvent(event)
 
+class RenderScheduler(QObject):
+    """所有标签页共用的渲染队列：优先级数值越小越先渲染，每轮事件循环只占用一小段时间。"""
+    PRIORITY_VISIBLE = 0
+    PRIORITY_NEARBY = 1
+    PRIORITY_BACKGROUND = 2
+    SLICE_SECONDS = 0.012
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.heap = []
+        self.queued = {}
+        self.seq = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.run_slice)
+
+    def request(self, tab, idx, priority):
+        key = (tab, idx)
+        if key in self.queued and self.queued[key] <= priority:
+            return
+        self.queued[key] = priority
+        self.seq += 1
+        heapq.heappush(self.heap, (priority, self.seq, tab, idx))
+        if not self.timer.isActive():
+            self.timer.start(0)
+
+    def cancel_tab(self, tab):
+        for key in [k for k in self.queued if k[0] is tab]:
+            del self.queued[key]
+
+    def pop_job(self):
+        # 堆里可能残留已取消或已提升优先级的旧条目，出队时跳过
+        while self.heap:
+            priority, _, tab, idx = heapq.heappop(self.heap)
+            if self.queued.get((tab, idx)) == priority:
+                del self.queued[(tab, idx)]
+                return tab, idx
+        return None
+
+    def run_slice(self):
+        deadline = time.perf_counter() + self.SLICE_SECONDS
+        while True:
+            job = self.pop_job()
+            if job is None:
+                return
+            job[0].render_scheduled_page(job[1])
+            if time.perf_counter() >= deadline:
+                break
+        if self.heap:
+            self.timer.start(0)
+
+    def drain(self):
+        """同步跑完队列（基准测试与脚本使用）。"""
+        self.timer.stop()
+        job = self.pop_job()
+        while job is not None:
+            job[0].render_scheduled_page(job[1])
+            job = self.pop_job()
+
+class PageMetrics:
+    """页面尺寸表（PDF 点）。打开时只读首页，其余页在首屏绘制后按时间片读 CropBox，
+    不加载页面、不光栅化；页面真正加载后用 page.rect（含旋转）校正。"""
+    CHUNK_SECONDS = 0.008
+
+    def __init__(self, doc):
+        self.doc = doc
+        first = doc.load_page(0).rect
+        self.default = (first.width, first.height)
+        self.sizes = [None] * doc.page_count
+        self.sizes[0] = self.default
+        self.next_unread = 1
+
+    def size(self, idx):
+        return self.sizes[idx] or self.default
+
+    def set_exact(self, idx, rect):
+        self.sizes[idx] = (rect.width, rect.height)
+
+    def done(self):
+        return self.next_unread >= len(self.sizes)
+
+    def read_chunk(self):
+        """读一个时间片的页尺寸，返回与默认尺寸不同的页码。"""
+        changed = []
+        deadline = time.perf_counter() + self.CHUNK_SECONDS
+        while self.next_unread < len(self.sizes) and time.perf_counter() < deadline:
+            idx = self.next_unread
+            self.next_unread += 1
+            if self.sizes[idx] is not None:
+                continue
+            if self.doc.is_pdf:
+                r = self.doc.page_cropbox(idx)
+            else:
+                r = self.doc.load_page(idx).rect
+            self.sizes[idx] = (r.width, r.height)
+            if self.sizes[idx] != self.default:
+                changed.append(idx)
+        return changed
+
+class PixmapBudget:
+    """所有文档共享的页面图像内存上限；超出时按最近最少使用跨文档淘汰，当前标签页的可见页不淘汰。"""
+    def __init__(self, limit_mb):
+        self.limit = limit_mb * 1024 * 1024
+        self.entries = OrderedDict()
+        self.used = 0
+
+    def add(self, tab, idx, nbytes):
+        key = (tab, idx)
+        self.used -= self.entries.pop(key, 0)
+        self.entries[key] = nbytes
+        self.used += nbytes
+        self.evict()
+
+    def touch(self, tab, idx):
+        if (tab, idx) in self.entries:
+            self.entries.move_to_end((tab, idx))
+
+    def remove(self, tab, idx):
+        self.used -= self.entries.pop((tab, idx), 0)
+
+    def evict(self):
+        # 先淘汰后台标签页，再淘汰当前标签页中不可见的页
+        for allow_current in (False, True):
+            for tab, idx in list(self.entries):
+                if self.used <= self.limit:
+                    return
+                if tab.is_pinned(idx) or (tab.is_current() and not allow_current):
+                    continue
+                perf.count("cache_evict")
+                tab.unload_page(idx)
+
+class PerfOverlay(QLabel):
+    """文档区左上角的半透明性能面板。"""
+    STAGES = ["first_paint", "metrics", "render", "convert", "text", "reflow", "paint", "relayout",
+              "check_visible", "classify", "annot_save"]
+
+    def __init__(self, main_win, parent=None):
+        super().__init__(parent)
+        self.main_win = main_win
+        self.setStyleSheet("background: rgba(0, 0, 0, 170); color: #7CFC00;"
+                           "font-family: monospace; font-size: 11px; padding: 6px;")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def set_active(self, active):
+        if active:
+            self.refresh()
+            self.show()
+            self.raise_()
+            self.timer.start(500)
+        else:
+            self.timer.stop()
+            self.hide()
+
+    def refresh(self):
+        stats = perf.summary()
+        lines = ["阶段            次数   平均ms   最大ms"]
+        for name in self.STAGES:
+            n, avg, worst = stats.get(name, (0, 0.0, 0.0))
+            lines.append(f"{name:<14s}{n:6d} {avg:8.2f} {worst:8.2f}")
+        mw = self.main_win
+        hits, misses = perf.counters.get("cache_hit", 0), perf.counters.get("cache_miss", 0)
+        hit_rate = hits / (hits + misses) * 100 if hits + misses else 0.0
+        loaded = sum(len(tab.loaded_pages) for tab in mw.all_tabs())
+        image_mb = mw.budget.used / 1024 / 1024
+        rss = process_rss_mb()
+        lines.append(f"文档 {len(mw.all_tabs())}  已加载页 {loaded}  待渲染 {len(mw.scheduler.queued)}")
+        lines.append(f"命中率 {hit_rate:.0f}%  淘汰 {perf.counters.get('cache_evict', 0)}")
+        lines.append(f"页面图像 {image_mb:.1f}/{mw.budget.limit / 1024 / 1024:.0f} MB  峰值RSS "
+                     + (f"{rss:.0f} MB" if rss is not None else "不可用"))
+        perf.sample("memory", {"page_images_mb": round(image_mb, 2), "loaded_pages": loaded})
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.move(8, self.main_win.tabs.tabBar().height() + 8)
+
+class PDFDocumentTab(QWidget):
+    """一个标签页对应一个文档：持有文档、滚动画布与各自的后台线程；渲染排队与内存上限由主窗口统一管理。"""
+    def __init__(self, main_win, path, parent=None):
+        super().__init__(parent)
+        self.open_started = time.perf_counter()
+        self.first_paint_ms = None
+        self.main_win = main_win
+        self.scheduler = main_win.scheduler
+        self.budget = main_win.budget
+        self.pdf_doc = fitz.open(path)
+        self.pdf_path = path
+        self.metrics = PageMetrics(self.pdf_doc)
+        self.loaded_pages = {}
+        self.preview_pages = set()
+        self.current_viewport_width = 0
+        self.page_height_hint = 800
+        self.highlight_colors = main_win.highlight_colors
+        self.highlight_data_dict = {}
+        self.user_zoom = 1.0
+        self.visible_range = (0, -1)
+        self.keep_range = (0, -1)
+        self.vocab_cache = {}
+        self.annots_imported = set()
+        self.dirty_highlight_pages = set()
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.canvas = PDFPageCanvas(self)
+        layout.addWidget(self.canvas)
+
+        self.canvas.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        self.scroll_timer = QTimer(self)
+        self.scroll_timer.setSingleShot(True)
+        self.scroll_timer.timeout.connect(self.check_visible_pages)
+        # 短时间内的连续编辑合并为一次保存
+        self.annot_save_timer = QTimer(self)
+        self.annot_save_timer.setSingleShot(True)
+        self.annot_save_timer.timeout.connect(self.flush_highlight_changes)
+        # 其余页的尺寸在首屏之后利用空闲时间补读
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.read_metrics_chunk)
+        self.annot_worker = AnnotationSyncWorker(path, self)
+        self.annot_worker.saved.connect(lambda n: main_win.statusBar().showMessage(f"已保存 {n} 页的高亮到PDF", 2000))
+        self.annot_worker.failed.connect(lambda msg: main_win.statusBar().showMessage(msg, 5000))
+        self.annot_worker.start()
+
+    def is_current(self):
+        return self.main_win.current_tab() is self
+
+    def is_pinned(self, idx):
+        return self.is_current() and self.visible_range[0] <= idx <= self.visible_range[1]
+
+    def close_document(self):
+        self.metrics_timer.stop()
+        self.stop_annot_worker()
+        self.scheduler.cancel_tab(self)
+        for idx in list(self.loaded_pages):
+            self.unload_page(idx)
+        self.pdf_doc.close()
+
+    # --------- 词汇分级标注 -----------
+    def refresh_vocab_overlay(self):
+        for idx in self.loaded_pages:
+            self.apply_vocab_overlay(idx)
+
+    def classify_page(self, idx, label):
+        # 复用页面加载时已提取的单词，只做纯 Python 的查表，不在其他线程调用 PyMuPDF
+        if idx not in self.vocab_cache:
+            with perf.span("classify", "vocab", page=idx, words=len(label.words)):
+                self.vocab_cache[idx] = classify_page_words(
+                    label.words, load_vocab_words("CET4_6_merged.txt"),
+                    load_vocab_words("GRE_TOEFL_OALD8_merged.txt"), load_vocab_words("words_alpha.txt"))
+        return self.vocab_cache[idx]
+
+    def apply_vocab_overlay(self, idx):
+        label = self.loaded_pages.get(idx)
+        if label is None:
+            return
+        vocab_tier = self.main_win.vocab_tier
+        if vocab_tier:
+            _, key, color = vocab_tier
+            label.set_vocab_words(self.classify_page(idx, label)[key], color)
+        else:
+            label.set_vocab_words([], None)
+
+    # --------- 高亮写回 PDF -----------
+    def mark_highlights_dirty(self, idx):
+        self.dirty_highlight_pages.add(idx)
+        self.annot_save_timer.start(1500)
+
+    def flush_highlight_changes(self):
+        self.annot_save_timer.stop()
+        if not self.dirty_highlight_pages or self.annot_worker is None:
+            return
+        specs = {idx: [highlight_to_annot_spec(h) for h in self.highlight_data_dict.get(idx, [])]
+                 for idx in self.dirty_highlight_pages}
+        self.dirty_highlight_pages.clear()
+        self.annot_worker.submit(specs)
+
+    def stop_annot_worker(self):
+        self.flush_highlight_changes()
+        if self.annot_worker:
+            self.annot_worker.stop()
+            self.annot_worker = None
+
+    # ----------- 首屏 -----------
+    def on_first_paint(self):
+        self.first_paint_ms = (time.perf_counter() - self.open_started) * 1000
+        if perf.enabled:
+            perf.add("first_paint", "viewer", self.open_started, self.first_paint_ms / 1000,
+                     {"pages": self.pdf_doc.page_count})
+        msg = f"首屏显示用时 {self.first_paint_ms:.0f} ms"
+        if self.first_paint_ms > FIRST_PAINT_TARGET_MS:
+            msg += f"，超过目标 {FIRST_PAINT_TARGET_MS} ms"
+        self.main_win.statusBar().showMessage(msg, 5000)
+        QTimer.singleShot(0, self.after_first_paint)
+
+    def after_first_paint(self):
+        """首屏出图后再做的次要工作：低清预览补成清晰版、目录、词汇标注、补读页尺寸。"""
+        if self.pdf_doc.is_closed:
+            return
+        for idx in sorted(self.preview_pages):
+            self.scheduler.request(self, idx, RenderScheduler.PRIORITY_VISIBLE)
+        if self.is_current():
+            self.main_win.load_toc()
+            self.refresh_vocab_overlay()
+        self.metrics_timer.start(0)
+
+    def read_metrics_chunk(self):
+        with perf.span("metrics", read=self.metrics.next_unread):
+            changed = self.metrics.read_chunk()
+        if self.metrics.done():
+            self.metrics_timer.stop()
+        if changed and not self.main_win.reflow_mode:
+            zoom = self.get_dynamic_zoom()
+            self.canvas.set_page_heights({i: self.page_display_rect(i, zoom).height
+                                          for i in changed if i not in self.loaded_pages})
+
+    # ----------- 布局与渲染 ---------
+    def page_display_rect(self, idx, zoom):
+        w, h = self.metrics.size(idx)
+        return (fitz.Rect(0, 0, w, h) * fitz.Matrix(zoom, zoom)).irect
+
+    def get_dynamic_zoom(self):
+        view_w = self.canvas.viewport().width()
+        pdf_w = self.metrics.size(0)[0]
+        if pdf_w == 0:
+            return self.user_zoom
+        zoom = view_w / pdf_w * 0.98
+        return zoom * self.user_zoom
+
+    def reload_pages(self):
+        with perf.span("relayout", pages=self.pdf_doc.page_count):
+            self.scheduler.cancel_tab(self)
+            for idx in list(self.loaded_pages):
+                self.unload_page(idx)
+            page_count = self.pdf_doc.page_count
+            if self.main_win.reflow_mode:
+                # 重排页的真实高度要排版后才知道，先按一屏估计
+                self.page_height_hint = self.canvas.viewport().height()
+                self.canvas.set_layout([self.page_height_hint] * page_count, self.canvas.viewport().width())
+            else:
+                zoom = self.get_dynamic_zoom()
+                first_rect = self.page_display_rect(0, zoom)
+                self.page_height_hint = first_rect.height
+                # 同尺寸的页只算一次
+                height_by_size = {}
+                heights = []
+                for idx in range(page_count):
+                    size = self.metrics.size(idx)
+                    if size not in height_by_size:
+                        height_by_size[size] = self.page_display_rect(idx, zoom).height
+                    heights.append(height_by_size[size])
+                self.canvas.set_layout(heights, first_rect.width)
+        self.check_visible_pages()
+
+    def on_scroll(self):
+        self.scroll_timer.start(50)
+
+    def check_visible_pages(self):
+        # 打开后延时触发的检查可能晚于关闭标签页
+        if self.pdf_doc.is_closed or not self.canvas.page_count():
+            return
+        with perf.span("check_visible"):
+            self.update_visible_pages()
+
+    def update_visible_pages(self):
+        y0 = self.canvas.scroll_y()
+        y1 = y0 + self.canvas.viewport().height()
+        first, last = self.canvas.page_at(y0), self.canvas.page_at(y1)
+        p_start = max(first - 2, 0)
+        p_end = min(last + 2, self.pdf_doc.page_count - 1)
+        self.visible_range = (first, last)
+        self.keep_range = (p_start, p_end)
+        current = self.is_current()
+        for i in range(p_start, p_end + 1):
+            if i in self.loaded_pages:
+                perf.count("cache_hit")
+                self.budget.touch(self, i)
+                continue
+            perf.count("cache_miss")
+            if not current:
+                priority = RenderScheduler.PRIORITY_BACKGROUND
+            elif first <= i <= last:
+                priority = RenderScheduler.PRIORITY_VISIBLE
+            else:
+                priority = RenderScheduler.PRIORITY_NEARBY
+            self.scheduler.request(self, i, priority)
+
+    def render_scheduled_page(self, idx):
+        if idx in self.preview_pages:
+            self.sharpen_page(idx)
+            return
+        # 排队期间可能已经滚走或已加载
+        if idx in self.loaded_pages or not self.keep_range[0] <= idx <= self.keep_range[1]:
+            return
+        self.load_page(idx)
+
+    def load_page(self, idx):
+        page = self.pdf_doc.load_page(idx)
+        annot_specs = []
+        if idx not in self.annots_imported:
+            annot_specs = take_highlight_annots(page)
+            self.annots_imported.add(idx)
+        mode = COLOR_MODES.get(self.main_win.mode_box.currentText(), "default")
+        highlight_data = self.highlight_data_dict.setdefault(idx, [])
+        if self.main_win.reflow_mode:
+            label = ReflowTextPage(page, idx, self.highlight_colors, self, highlight_data,
+                                   view_width=self.canvas.viewport().width(),
+                                   font_px=REFLOW_FONT_PX * self.user_zoom, mode=mode)
+        else:
+            self.metrics.set_exact(idx, page.rect)
+            # 首屏出图前先给低清预览，绘制后再由 sharpen_page 补成清晰版
+            preview = self.first_paint_ms is None
+            qimg = self.render_page_image(page, mode, PREVIEW_SCALE if preview else 1.0)
+            if preview:
+                self.preview_pages.add(idx)
+            label = WordHighlightPDFPage(page, qimg, idx, self.highlight_colors, self, highlight_data)
+        for spec in annot_specs:
+            h = annot_spec_to_highlight(spec, label.words)
+            if h:
+                highlight_data.append(h)
+        self.loaded_pages[idx] = label
+        self.canvas.set_page_height(idx, label.height())
+        self.canvas.update_page(idx)
+        self.apply_vocab_overlay(idx)
+        self.budget.add(self, idx, label.image_bytes())
+
+    def render_page_image(self, page, mode, scale=1.0):
+        zoom = self.get_dynamic_zoom()
+        with perf.span("render", page=page.number, zoom=round(zoom * scale, 3)):
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom * scale, zoom * scale), alpha=False)
+        with perf.span("convert", page=page.number, mode=mode):
+            qimg = fitz_pix_to_qimage(pix, mode)
+        if scale != 1.0:
+            full = (page.rect * fitz.Matrix(zoom, zoom)).irect
+            qimg = qimg.scaled(full.width, full.height, Qt.IgnoreAspectRatio, Qt.FastTransformation)
+        return qimg
+
+    def sharpen_page(self, idx):
+        self.preview_pages.discard(idx)
+        label = self.loaded_pages.get(idx)
+        if label is None:
+            return
+        mode = COLOR_MODES.get(self.main_win.mode_box.currentText(), "default")
+        label.set_image(self.render_page_image(label.page, mode))
+        self.budget.add(self, idx, label.image_bytes())
+        self.canvas.update_page(idx)
+
+    def unload_page(self, idx):
+        self.preview_pages.discard(idx)
+        label = self.loaded_pages.pop(idx)
+        self.highlight_data_dict[idx] = label.highlights
+        self.budget.remove(self, idx)
+        self.canvas.update_page(idx)
+
+    def update_pages_and_keep_mouse_focus(self, page_idx, mouse_pos, old_zoom):
+        old_rect = self.canvas.page_rect(page_idx)
+        mouse_x_frac = mouse_pos.x() / max(1, old_rect.width())
+        mouse_y_frac = mouse_pos.y() / max(1, old_rect.height())
+        self.reload_pages()
+        new_rect = self.canvas.page_rect(page_idx)
+        target_x = new_rect.x() + mouse_x_frac * new_rect.width()
+        target_y = new_rect.y() + mouse_y_frac * new_rect.height()
+        viewport = self.canvas.viewport()
+        vx = max(0, int(target_x - viewport.width() / 2))
+        vy = max(0, int(target_y - viewport.height() / 2))
+        self.canvas.set_scroll_x(vx)
+        self.canvas.set_scroll_y(vy)
+        self.check_visible_pages()
+
+    def jump_to(self, p):
+        self.canvas.set_scroll_y(self.canvas.page_top(p))
+        self.check_visible_pages()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        new_width = self.canvas.viewport().width()
+        if new_width != self.current_viewport_width:
+            self.current_viewport_width = new_width
+            self.reload_pages()
+
 class LazyPDFViewer(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("PyQt PDF阅读器（高亮/批注/目录导航）")
         self.resize(1200, 800)
-        self.pdf_doc = None
-        self.loaded_pages = {}
         self.current_mode = "默认"
-        self.current_viewport_width = 0
-        self.max_pages_mem = 10
-        self.page_height_hint = 800
         self.highlight_colors = [
             ("黄色", (255, 255, 0)),
             ("绿色", (0, 255, 100)),
@@ -218,8 +1301,10 @@ class LazyPDFViewer(QMainWindow):
             ("粉色",  (255, 160, 255)),
             ("橙色",  (255, 180, 40)),
         ]
-        self.highlight_data_dict = {}
-        self.user_zoom = 1.0
+        self.vocab_tier = None
+        self.reflow_mode = False
+        self.scheduler = RenderScheduler(self)
+        self.budget = PixmapBudget(PIXMAP_BUDGET_MB)
 
         # ---- UI ----
         main_widget = QWidget()
@@ -242,6 +1327,9 @@ class LazyPDFViewer(QMainWindow):
         self.mode_box = QComboBox()
         self.mode_box.addItems(["默认", "夜间", "护眼"])
         self.mode_box.currentIndexChanged.connect(self.reload_pages)
+        self.reflow_btn = QPushButton("重排阅读")
+        self.reflow_btn.setCheckable(True)
+        self.reflow_btn.toggled.connect(self.toggle_reflow_mode)
         self.page_edit = QLineEdit()
         self.page_edit.setPlaceholderText("跳转页码")
         self.jump_btn = QPushButton("跳转")
@@ -249,66 +1337,96 @@ class LazyPDFViewer(QMainWindow):
         self.page_info = QLabel("")
         self.copy_btn = QPushButton("复制所选文字")
         self.copy_btn.clicked.connect(self.copy_selected_text)
+        self.vocab_box = QComboBox()
+        self.vocab_box.addItems(["词汇标注：关闭"] + [name for name, _, _ in VOCAB_TIERS])
+        self.vocab_box.currentIndexChanged.connect(self.on_vocab_tier_changed)
+        self.perf_btn = QPushButton("性能面板")
+        self.perf_btn.setCheckable(True)
+        self.perf_btn.toggled.connect(self.toggle_perf_overlay)
+        self.trace_btn = QPushButton("导出性能追踪")
+        self.trace_btn.clicked.connect(self.export_perf_trace)
         top_bar.addWidget(open_btn)
         top_bar.addWidget(self.mode_box)
+        top_bar.addWidget(self.reflow_btn)
+        top_bar.addWidget(self.vocab_box)
         top_bar.addWidget(self.page_edit)
         top_bar.addWidget(self.jump_btn)
         top_bar.addWidget(self.copy_btn)
+        top_bar.addWidget(self.perf_btn)
+        top_bar.addWidget(self.trace_btn)
         top_bar.addWidget(self.page_info)
         top_bar.addStretch()
         vbox.addLayout(top_bar)
 
-        self.scroll = QScrollArea(self)
-        self.inner_widget = QWidget()
-        self.inner_layout = QVBoxLayout(self.inner_widget)
-        self.inner_layout.setAlignment(Qt.AlignTop)
-        self.scroll.setWidget(self.inner_widget)
-        self.scroll.setWidgetResizable(True)
-        vbox.addWidget(self.scroll)
+        self.tabs = QTabWidget()
+        self.tabs.setTabsClosable(True)
+        self.tabs.setDocumentMode(True)
+        self.tabs.tabCloseRequested.connect(self.close_tab)
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        vbox.addWidget(self.tabs)
         right_widget.setLayout(vbox)
         self.splitter.addWidget(right_widget)
         self.splitter.setSizes([240, 900])
         main_layout.addWidget(self.splitter)
         self.setCentralWidget(main_widget)
 
-        self.scroll.verticalScrollBar().valueChanged.connect(self.on_scroll)
-        self.scroll_timer = QTimer(self)
-        self.scroll_timer.setSingleShot(True)
-        self.scroll_timer.timeout.connect(self.check_visible_pages)
+        self.perf_overlay = PerfOverlay(self, self.tabs)
+
+    def current_tab(self):
+        return self.tabs.currentWidget()
+
+    def all_tabs(self):
+        return [self.tabs.widget(i) for i in range(self.tabs.count())]
 
     def open_pdf(self):
         path, _ = QFileDialog.getOpenFileName(self, "选择PDF", "", "PDF Files (*.pdf)")
         if not path:
             return
-        self.pdf_doc = fitz.open(path)
-        self.page_info.setText(f"共 {self.pdf_doc.page_count} 页")
-        self.loaded_pages.clear()
-        self.highlight_data_dict.clear()
-        for i in reversed(range(self.inner_layout.count())):
-            widget = self.inner_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-        first_page = self.pdf_doc.load_page(0)
-        zoom = self.get_dynamic_zoom()
-        mat = fitz.Matrix(zoom, zoom)
-        pix = first_page.get_pixmap(matrix=mat, alpha=False)
-        self.page_height_hint = pix.height + 16
-        for i in range(self.pdf_doc.page_count):
-            ph = QWidget()
-            hbox = QHBoxLayout(ph)
-            hbox.setContentsMargins(0,0,0,0)
-            hbox.addStretch()
-            self.inner_layout.addWidget(ph)
-        self.reload_pages()
-        QTimer.singleShot(100, self.check_visible_pages)
-        self.load_toc()
+        self.load_pdf(path)
+
+    def load_pdf(self, path):
+        tab = PDFDocumentTab(self, path)
+        index = self.tabs.addTab(tab, os.path.basename(path))
+        self.tabs.setTabToolTip(index, path)
+        self.tabs.setCurrentIndex(index)
+        tab.reload_pages()
+        QTimer.singleShot(100, tab.check_visible_pages)
+        return tab
+
+    def close_tab(self, index):
+        tab = self.tabs.widget(index)
+        self.tabs.removeTab(index)
+        tab.close_document()
+        tab.deleteLater()
+
+    def on_tab_changed(self, index):
+        tab = self.current_tab()
+        if tab is None:
+            self.page_info.setText("")
+            self.toc_tree.clear()
+            return
+        self.page_info.setText(f"共 {tab.pdf_doc.page_count} 页")
+        # 首屏绘制前不建目录、不启动词汇标注，由 after_first_paint 补上
+        if tab.first_paint_ms is not None:
+            self.load_toc()
+        else:
+            self.toc_tree.clear()
+        # 当前页签按可见优先级重新排队，其余页签降为后台预取
+        for other in self.all_tabs():
+            if other is not tab:
+                self.scheduler.cancel_tab(other)
+                other.check_visible_pages()
+        tab.check_visible_pages()
+        if tab.first_paint_ms is not None:
+            tab.refresh_vocab_overlay()
 
     # --------- 目录树支持 -----------
     def load_toc(self):
         self.toc_tree.clear()
-        if not self.pdf_doc:
+        tab = self.current_tab()
+        if tab is None:
             return
-        toc = self.pdf_doc.get_toc(simple=False)
+        toc = tab.pdf_doc.get_toc(simple=False)
         if not toc:
             root = QTreeWidgetItem(self.toc_tree, ["无目录"])
             root.setData(0, Qt.UserRole, None)
@@ -336,147 +1454,61 @@ class LazyPDFViewer(QMainWindow):
             self.page_edit.setText(str(page + 1))
             self.jump_page()
 
-    # ----------- 其余功能与之前一致 ---------
-    def get_dynamic_zoom(self):
-        if not self.pdf_doc:
-            return 1.0
-        view_w = self.scroll.viewport().width()
-        pdf_w = self.pdf_doc.load_page(0).rect.width
-        if pdf_w == 0:
-            return self.user_zoom
-        zoom = view_w / pdf_w * 0.98
-        return zoom * self.user_zoom
+    # --------- 词汇分级标注 -----------
+    def on_vocab_tier_changed(self, index):
+        self.vocab_tier = VOCAB_TIERS[index - 1] if index > 0 else None
+        if self.vocab_tier and self.vocab_tier[1] == "unknown" and not load_vocab_words("words_alpha.txt"):
+            self.statusBar().showMessage("未找到 words_alpha.txt：生词只按规则估计，跳过含大写字母和不足 3 个字母的词", 8000)
+        for tab in self.all_tabs():
+            tab.refresh_vocab_overlay()
 
-    def reload_pages(self):
-        self.loaded_pages.clear()
-        for i in reversed(range(self.inner_layout.count())):
-            widget = self.inner_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-        for i in range(self.pdf_doc.page_count if self.pdf_doc else 0):
-            ph = QWidget()
-            hbox = QHBoxLayout(ph)
-            hbox.setContentsMargins(0,0,0,0)
-            hbox.addStretch()
-            self.inner_layout.addWidget(ph)
-        self.check_visible_pages()
+    # --------- 重排阅读 -----------
+    def toggle_reflow_mode(self, checked):
+        self.reflow_mode = checked
+        self.reload_pages()
 
-    def on_scroll(self):
-        self.scroll_timer.start(50)
+    # --------- 性能面板 -----------
+    def toggle_perf_overlay(self, checked):
+        perf.enabled = checked
+        self.perf_overlay.set_active(checked)
 
-    def check_visible_pages(self):
-        if not self.pdf_doc:
+    def export_perf_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出性能追踪", "trace.json", "Chrome Trace (*.json)")
+        if not path:
             return
-        bar = self.scroll.verticalScrollBar()
-        y0 = bar.value()
-        y1 = y0 + self.scroll.viewport().height()
-        p_start = max(int(y0 // self.page_height_hint) - 2, 0)
-        p_end = min(int(y1 // self.page_height_hint) + 2, self.pdf_doc.page_count - 1)
-        for i in range(self.pdf_doc.page_count):
-            item = self.inner_layout.itemAt(i)
-            if p_start <= i <= p_end:
-                if i not in self.loaded_pages:
-                    self.load_page(i)
-            else:
-                if i in self.loaded_pages:
-                    self.highlight_data_dict[i] = self.loaded_pages[i].highlights
-                    w = self.loaded_pages.pop(i)
-                    for child in item.widget().children():
-                        if isinstance(child, QLabel):
-                            child.setParent(None)
-        while len(self.loaded_pages) > self.max_pages_mem:
-            farthest = max(self.loaded_pages, key=lambda idx: abs((p_start+p_end)//2-idx))
-            self.highlight_data_dict[farthest] = self.loaded_pages[farthest].highlights
-            w = self.loaded_pages.pop(farthest)
-            for j in range(self.inner_layout.count()):
-                container = self.inner_layout.itemAt(j).widget()
-                for child in container.children():
-                    if isinstance(child, QLabel):
-                        child.setParent(None)
+        perf.export_chrome_trace(path)
+        QMessageBox.information(self, "已导出", f"共 {len(perf.events)} 条记录，可在 chrome://tracing 或 Perfetto 中打开。")
 
-    def load_page(self, idx):
-        page = self.pdf_doc.load_page(idx)
-        mode = self.mode_box.currentText()
-        zoom = self.get_dynamic_zoom()
-        mat = fitz.Matrix(zoom, zoom)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        if mode == "夜间":
-            qimg = fitz_pix_to_qimage(pix, "night")
-        elif mode == "护眼":
-            qimg = fitz_pix_to_qimage(pix, "eye")
-        else:
-            qimg = fitz_pix_to_qimage(pix, "default")
-        highlight_data = self.highlight_data_dict.get(idx, [])
-        label = WordHighlightPDFPage(page, qimg, idx, self.highlight_colors, self, highlight_data)
-        label.setMinimumHeight(qimg.height())
-        label.setMaximumHeight(qimg.height())
-        center_widget = QWidget()
-        hbox = QHBoxLayout(center_widget)
-        hbox.setContentsMargins(0, 0, 0, 0)
-        hbox.setAlignment(Qt.AlignHCenter)
-        hbox.addWidget(label)
-        self.inner_layout.insertWidget(idx, center_widget)
-        self.loaded_pages[idx] = label
-
-    def update_pages_and_keep_mouse_focus(self, page_idx, mouse_pos, old_zoom):
-        if not self.pdf_doc:
-            return
-        old_zoom_factor = self.get_dynamic_zoom() / self.user_zoom
-        page = self.pdf_doc.load_page(page_idx)
-        pdf_rect = page.rect
-        qimg_w_old = int(pdf_rect.width * old_zoom_factor)
-        qimg_h_old = int(pdf_rect.height * old_zoom_factor)
-        mouse_x_frac = mouse_pos.x() / max(1, qimg_w_old)
-        mouse_y_frac = mouse_pos.y() / max(1, qimg_h_old)
-        self.reload_pages()
-        label = self.loaded_pages.get(page_idx)
-        if label:
-            qimg_w_new = label.base_qimg.width()
-            qimg_h_new = label.base_qimg.height()
-            for i in range(self.inner_layout.count()):
-                container = self.inner_layout.itemAt(i).widget()
-                if label in container.children():
-                    label_pos = container.pos()
-                    break
-            else:
-                label_pos = label.pos()
-            target_x = label_pos.x() + mouse_x_frac * qimg_w_new
-            target_y = label_pos.y() + mouse_y_frac * qimg_h_new
-            viewport = self.scroll.viewport()
-            vx = max(0, int(target_x - viewport.width() / 2))
-            vy = max(0, int(target_y - viewport.height() / 2))
-            self.scroll.horizontalScrollBar().setValue(vx)
-            self.scroll.verticalScrollBar().setValue(vy)
+    # ----------- 其余功能与之前一致 ---------
+    def reload_pages(self):
+        tab = self.current_tab()
+        for other in self.all_tabs():
+            if other is not tab:
+                other.reload_pages()
+        if tab is not None:
+            tab.reload_pages()
 
     def jump_page(self):
-        if not self.pdf_doc:
+        tab = self.current_tab()
+        if tab is None:
             return
         try:
             p = int(self.page_edit.text()) - 1
-            if not (0 <= p < self.pdf_doc.page_count):
+            if not (0 <= p < tab.pdf_doc.page_count):
                 QMessageBox.warning(self, "提示", "页码超出范围")
                 return
-            label = self.loaded_pages.get(p)
-            if not label:
-                self.load_page(p)
-                label = self.loaded_pages[p]
-            for i in range(self.inner_layout.count()):
-                container = self.inner_layout.itemAt(i).widget()
-                if label in container.children():
-                    self.scroll.ensureWidgetVisible(container)
-                    break
+            tab.jump_to(p)
         except:
             pass
 
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        new_width = self.scroll.viewport().width()
-        if new_width != self.current_viewport_width:
-            self.current_viewport_width = new_width
-            self.reload_pages()
+    def closeEvent(self, event):
+        for tab in self.all_tabs():
+            tab.close_document()
+        super().closeEvent(event)
 
     def copy_selected_text(self):
-        for label in self.loaded_pages.values():
+        tab = self.current_tab()
+        for label in (tab.loaded_pages.values() if tab else []):
             text = label.get_selected_text()
             if text:
                 QApplication.clipboard().setText(text)